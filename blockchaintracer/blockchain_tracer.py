@@ -1,13 +1,21 @@
 import os
-import json
 import hashlib
+import hmac
 import time
-from typing import Any, Dict, Optional
-from web3 import Web3
-from eth_account.messages import encode_defunct
+import copy
+import mmap
+import threading
+import sqlite3
+from contextlib import closing
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 import warnings
 from types import MappingProxyType
 
+import orjson
+
 try:
     import ipfshttpclient
     IPFS_AVAILABLE = True
@@ -15,6 +23,178 @@ except ImportError:
     IPFS_AVAILABLE = False
     warnings.warn("ipfshttpclient not available.")
 
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+try:
+    import cbor2
+    CBOR_AVAILABLE = True
+except ImportError:
+    CBOR_AVAILABLE = False
+
+# web3, eth_account and requests are imported where they are used: they are slow to
+# import and not needed for offline use (e.g. compute_hash)
+if TYPE_CHECKING:
+    import requests
+
+# Read size used when hashing files without hashlib.file_digest
+_FILE_CHUNK_SIZE = 1 << 20
+
+SUPPORTED_HASH_ALGOS = ("sha256", "keccak256", "blake3")
+
+# Files at least this large are hashed by blake3 on multiple threads
+_BLAKE3_THREADED_MIN_SIZE = 16 << 20
+
+# Seconds a fetched gas price is reused before querying the node again
+_GAS_PRICE_TTL = 15
+
+# Number of decoded transactions kept in memory per tracer
+_TX_CACHE_SIZE = 1024
+
+# Number of block timestamps kept in memory per tracer
+_BLOCK_CACHE_SIZE = 512
+
+# Blocks older than this (in seconds) are treated as final and safe to cache.
+# Ethereum mainnet finalizes after two epochs (~13 minutes).
+_BLOCK_FINALITY_AGE = 15 * 60
+
+# SQLite file (inside storage_dir) holding the locally saved records
+_RECORDS_DB_NAME = "records.db"
+
+# Timeout in seconds for each HTTP request to the blockchain provider
+_RPC_TIMEOUT = 30
+
+# Leading byte of CBOR-encoded on-chain payloads (JSON payloads never start with it)
+_CBOR_PAYLOAD_TAG = b"\x01"
+
+
+def _check_hash_algo(hash_algo: str) -> None:
+    """
+    Raise if hash_algo is not a supported algorithm or its package is not installed.
+    """
+    if hash_algo not in SUPPORTED_HASH_ALGOS:
+        raise ValueError(
+            f"Unsupported hash_algo '{hash_algo}'. Choose one of {SUPPORTED_HASH_ALGOS}."
+        )
+    if hash_algo == "blake3" and not BLAKE3_AVAILABLE:
+        raise ImportError(
+            "blake3 is required for hash_algo='blake3'. Install it with: pip install blake3"
+        )
+
+
+def _canonical_json(data: Any) -> bytes:
+    """
+    Serialize data to canonical JSON bytes (sorted keys, compact separators).
+
+    Always encoded with orjson, so the bytes (and the data hash) do not depend on the
+    environment. Non-string dict keys are converted to strings (e.g. 0 -> "0"), as the
+    json module does. Integers above 64 bits cannot be encoded and raise TypeError.
+    """
+    return orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+
+
+# Parses JSON from bytes
+_json_loads = orjson.loads
+
+
+def _json_default(obj: Any) -> Any:
+    """
+    JSON encoder fallback for web3 types found in transaction results (HexBytes, AttributeDict).
+    """
+    if isinstance(obj, bytes):
+        return "0x" + obj.hex()
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _make_http_session() -> "requests.Session":
+    """
+    Create a pooled keep-alive HTTP session, reused for every RPC call to the provider.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _connect_records_db(storage_dir: str) -> sqlite3.Connection:
+    """
+    Open (and create if needed) the local records database inside storage_dir.
+    """
+    os.makedirs(storage_dir, exist_ok=True)
+    conn = sqlite3.connect(
+        os.path.join(storage_dir, _RECORDS_DB_NAME), isolation_level=None
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS records ("
+        "hash TEXT PRIMARY KEY, tx_hash TEXT, block_number INTEGER, payload BLOB NOT NULL)"
+    )
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(records)")}
+    if "tx_hash" not in columns:
+        _migrate_records_db(conn)
+    conn.execute("CREATE INDEX IF NOT EXISTS records_tx_hash ON records (tx_hash)")
+    return conn
+
+
+def _migrate_records_db(conn: sqlite3.Connection) -> None:
+    """
+    Add the tx_hash and block_number columns to a records table created before they existed,
+    filling them in from the saved payloads.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Another process may have migrated the table while we waited for the lock
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(records)")}
+        if "tx_hash" not in columns:
+            conn.execute("ALTER TABLE records ADD COLUMN tx_hash TEXT")
+            conn.execute("ALTER TABLE records ADD COLUMN block_number INTEGER")
+            rows = conn.execute("SELECT hash, payload FROM records").fetchall()
+            for data_hash, payload in rows:
+                record = _json_loads(payload)
+                conn.execute(
+                    "UPDATE records SET tx_hash = ?, block_number = ? WHERE hash = ?",
+                    (
+                        _normalize_tx_hash(record["transaction_hash"]),
+                        record.get("block_number"),
+                        data_hash,
+                    ),
+                )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+_thread_buffers = threading.local()
+
+
+def _read_buffer() -> memoryview:
+    """
+    Return this thread's reusable _FILE_CHUNK_SIZE read buffer (one per hashing worker).
+    """
+    view = getattr(_thread_buffers, "view", None)
+    if view is None:
+        view = _thread_buffers.view = memoryview(bytearray(_FILE_CHUNK_SIZE))
+    return view
+
+
+def _normalize_tx_hash(tx_hash: str) -> str:
+    """
+    Lowercase hex transaction hash without the 0x prefix, as stored in the records database.
+    """
+    tx_hash = tx_hash.lower()
+    return tx_hash[2:] if tx_hash.startswith("0x") else tx_hash
+
 
 class BlockchainTracer:
     """
@@ -32,24 +212,47 @@ class BlockchainTracer:
     def __init__(
         self,
         provider_url: Optional[str] = None,
+        hash_algo: str = "sha256",
+        poll_latency: float = 0.1,
     ):
         """
         Initialize the blockchain tracer.
 
         Args:
             provider_url: URL of the blockchain provider (e.g., Infura, Alchemy). Optional.
+            hash_algo: Hash algorithm used by compute_hash. "sha256" (default), "keccak256",
+                which matches Ethereum's native hash, or "blake3" (much faster on large files,
+                requires the optional blake3 package).
+            poll_latency: Seconds between receipt polls while waiting for a transaction to be mined.
+                Lower values return sooner on fast chains (L2s); higher values send fewer RPC calls.
         Note:
             The private key is loaded exclusively from the BLOCKCHAIN_PRIVATE_KEY environment variable for security reasons.
         """
+        _check_hash_algo(hash_algo)
+        self.hash_algo = hash_algo
+        self.poll_latency = poll_latency
         self._blockchain_data = {}
-        self.web3 = None
-        self.account = None
+        # Canonical JSON bytes and hash of _blockchain_data, reused until the data changes
+        self._data_dirty = True
+        self._canonical_cache = None
+        # (absolute path, mtime_ns, size, hash_algo) -> file hash, so unchanged files are not re-read
+        self._file_hash_cache = {}
+        # Web3 client and account are built on first use, see the web3/account properties
+        self._provider_url = provider_url
+        self._web3 = None
+        self._account = None
+        # Chain id, local nonce and (fetch time, gas price), to save RPC round-trips per write
+        self._chain_id = None
+        self._nonce = None
+        self._gas_price_cache = None
+        # LRUs of finalized data, which can no longer be reorganized:
+        # tx hash -> decoded transaction details, and block number -> block timestamp
+        self._tx_details_cache = OrderedDict()
+        self._block_timestamps = OrderedDict()
+        self._cache_lock = threading.Lock()
         self.__private_key = os.environ.get("BLOCKCHAIN_PRIVATE_KEY", None)
         if provider_url:
-            self.web3 = Web3(Web3.HTTPProvider(provider_url))
-            if self.__private_key:
-                self.account = self.web3.eth.account.from_key(self.__private_key)
-            else:
+            if not self.__private_key:
                 warnings.warn(
                     "No private key provided. The tracer is in read-only mode.\n"
                     "For security, set the BLOCKCHAIN_PRIVATE_KEY environment variable in your shell before starting Jupyter or Python,\n"
@@ -61,37 +264,165 @@ class BlockchainTracer:
                 "Set the provider_url argument to connect to a blockchain node (e.g., Infura or Alchemy)."
             )
 
-    def compute_hash(self, data: Any) -> str:
+    @property
+    def web3(self):
+        """
+        Web3 client for provider_url, created on first access. None without a provider_url.
+        """
+        if self._web3 is None and self._provider_url:
+            from web3 import Web3
+
+            self._web3 = Web3(
+                Web3.HTTPProvider(
+                    self._provider_url,
+                    session=_make_http_session(),
+                    request_kwargs={"timeout": _RPC_TIMEOUT},
+                )
+            )
+        return self._web3
+
+    @property
+    def account(self):
+        """
+        Signing account for the private key, created on first access.
+        None in read-only mode (no provider_url or no private key).
+        """
+        if self._account is None and self._provider_url and self.__private_key:
+            from eth_account import Account
+
+            self._account = Account.from_key(self.__private_key)
+        return self._account
+
+    def _new_hasher(self, hash_algo: Optional[str] = None):
         """
-        Compute a SHA-256 hash for the provided data.
+        Return a new incremental hash object for hash_algo (default: the tracer's hash_algo).
+        """
+        if hash_algo is None:
+            hash_algo = self.hash_algo
+        else:
+            _check_hash_algo(hash_algo)
+        if hash_algo == "keccak256":
+            from eth_hash.auto import keccak
+
+            return keccak.new(b"")
+        if hash_algo == "blake3":
+            return blake3.blake3()
+        return hashlib.sha256()
+
+    def compute_hash(self, data: Any, hash_algo: Optional[str] = None) -> str:
+        """
+        Compute a hash for the provided data, using the tracer's hash_algo (SHA-256 by default).
 
-        This function supports three main use cases:
-        1. If `data` is a string and is a valid file path, it reads the file in chunks and computes the hash of its contents.
-        2. If `data` is a bytes object, it computes the hash directly from those bytes.
-        3. For any other type (e.g., dict, list, or string that is not a file path), it serializes the data to a JSON string
-           (with sorted keys for consistency) and computes the hash of the resulting UTF-8 encoded string.
+        This function supports two use cases:
+        1. If `data` is a bytes object, it computes the hash directly from those bytes.
+        2. For any other type (e.g., str, dict, list), it serializes the data to canonical JSON bytes
+           (sorted keys, compact separators) and computes the hash of those bytes.
 
-        This approach ensures generating a unique, reproducible hash for files, raw bytes, or structured data
+        This approach ensures generating a unique, reproducible hash for raw bytes or structured data
         (like dicts or lists), which is useful for verifying data integrity or storing fingerprints on the blockchain.
+        Strings are always hashed as data; use compute_file_hash to hash the contents of a file.
 
         Args:
-            data: The data to hash. Can be a file path (str), bytes, or any JSON-serializable object.
+            data: The data to hash. Can be bytes or any JSON-serializable object.
+            hash_algo: Hash algorithm to use instead of the tracer's one (e.g. to check old records).
 
         Returns:
-            str: The SHA-256 hash as a hexadecimal string.
-        """
-        if isinstance(data, str) and os.path.isfile(data):
-            # If data is a file path, hash the file contents
-            sha256_hash = hashlib.sha256()
-            with open(data, "rb") as f:
-                for byte_block in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(byte_block)
-            return sha256_hash.hexdigest()
-        elif isinstance(data, bytes):
-            return hashlib.sha256(data).hexdigest()
+            str: The hash as a hexadecimal string.
+
+        Raises:
+            TypeError: If data contains integers above 64 bits, which cannot be serialized
+                (store them as strings instead).
+        """
+        hasher = self._new_hasher(hash_algo)
+        if isinstance(data, bytes):
+            hasher.update(data)
         else:
-            serialized = json.dumps(data, sort_keys=True)
-            return hashlib.sha256(serialized.encode()).hexdigest()
+            hasher.update(_canonical_json(data))
+        return hasher.digest().hex()
+
+    def compute_file_hash(self, path: str) -> str:
+        """
+        Compute the hash of a file's contents, using the tracer's hash_algo (SHA-256 by default).
+        The file is streamed into the hash in large blocks, so big files are never fully loaded in memory.
+        Results are cached per tracer by (path, modification time, size), so unchanged files are hashed once.
+
+        Args:
+            path: Path to the file to hash.
+
+        Returns:
+            str: The hash as a hexadecimal string.
+        """
+        stat = os.stat(path)
+        cache_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, self.hash_algo)
+        file_hash = self._file_hash_cache.get(cache_key)
+        if file_hash is None:
+            file_hash = self._hash_file(path)
+            self._file_hash_cache[cache_key] = file_hash
+        return file_hash
+
+    def _hash_file(self, path: str) -> str:
+        """
+        Hash a file's contents without caching. Used by compute_file_hash.
+        """
+        if self.hash_algo == "blake3" and hasattr(blake3.blake3, "update_mmap"):
+            # blake3 maps and hashes the file itself, outside the GIL. Large files are
+            # also split across threads; for small ones the thread startup is not worth it
+            if os.path.getsize(path) >= _BLAKE3_THREADED_MIN_SIZE:
+                hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
+            else:
+                hasher = blake3.blake3()
+            return hasher.update_mmap(path).hexdigest()
+        with open(path, "rb") as f:
+            # Files are read front to back once: let the kernel read ahead aggressively
+            if hasattr(os, "posix_fadvise"):
+                try:
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                except OSError:
+                    pass
+            if self.hash_algo == "sha256" and hasattr(hashlib, "file_digest"):
+                return hashlib.file_digest(f, "sha256").hexdigest()
+            hasher = self._new_hasher()
+            # Map the whole file and hash it in one update call, without Python-level chunking
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    if hasattr(mmap, "MADV_SEQUENTIAL"):
+                        mapped.madvise(mmap.MADV_SEQUENTIAL)
+                    with memoryview(mapped) as view:
+                        hasher.update(view)
+                return hasher.digest().hex()
+            except (OSError, ValueError):
+                # Empty or non-mappable files (e.g. pipes): fall back to buffered reads
+                pass
+            # Reuse one buffer per thread to avoid allocating a bytes object per chunk or file
+            view = _read_buffer()
+            while True:
+                n = f.readinto(view)
+                if not n:
+                    break
+                hasher.update(view[:n])
+        return hasher.digest().hex()
+
+    def compute_hashes_batch(self, paths: List[str]) -> Dict[str, str]:
+        """
+        Compute the hashes of several files in parallel.
+
+        Each file is hashed with compute_file_hash in a thread pool. hashlib releases the GIL
+        while hashing, so files are processed concurrently on multiple cores.
+
+        Args:
+            paths: List of file paths to hash.
+
+        Returns:
+            Dict mapping each path to its hash as a hexadecimal string.
+        """
+        if not paths:
+            return {}
+        if len(paths) == 1:
+            # No point in starting a thread pool for a single file
+            return {paths[0]: self.compute_file_hash(paths[0])}
+        max_workers = min(len(paths), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(zip(paths, executor.map(self.compute_file_hash, paths)))
 
     def update_data(
         self, file_paths: Optional[Dict[str, str]] = None, **kwargs
@@ -101,23 +432,29 @@ class BlockchainTracer:
         This method allows accumulating data before writing it to the blockchain.
 
         Args:
-            file_paths: Dictionary of file paths to hash, with keys as identifiers
-            **kwargs: Arbitrary key-value pairs to add/update in the current data dict
+            file_paths: Dictionary of file paths to hash, with keys as identifiers.
+                The hashes are stored under "file_hashes" as {identifier: hash}.
+            **kwargs: Arbitrary key-value pairs to add/update in the current data dict.
+                Values must be JSON-serializable; integers above 64 bits are not supported
+                and make hashing and writing raise TypeError (store them as strings instead).
 
         Returns:
             Dict containing the current data state
         """
 
+        self._data_dirty = True
+
         # Write all kwargs directly to the blockchain data dict
         for key, value in kwargs.items():
             self._blockchain_data[key] = value
 
         if file_paths:
+            # Stored as a flat {key: hash} mapping; local paths are not traced
+            file_hashes = self._blockchain_data.setdefault("file_hashes", {})
+            # Hash all files concurrently; each distinct path is hashed once
+            path_hashes = self.compute_hashes_batch(list(dict.fromkeys(file_paths.values())))
             for key, path in file_paths.items():
-                self._blockchain_data["file_hashes"][key] = {
-                    #'path': path,
-                    "hash": self.compute_hash(path)
-                }
+                file_hashes[key] = path_hashes[path]
 
         return MappingProxyType(self._blockchain_data)
 
@@ -126,6 +463,7 @@ class BlockchainTracer:
         only_write_hash=False,
         save_locally=False,
         storage_dir: str = "./blockchain_storage",
+        payload_format: str = "json",
     ) -> Dict[str, Any]:
         """
         Write the current data to the blockchain.
@@ -133,37 +471,62 @@ class BlockchainTracer:
 
         Args:
             only_write_hash: If True, only the hash of the data is written to the blockchain.
-            save_locally: If True, save the data package and signature locally.
-            storage_dir: Optional directory to save local files.
+            save_locally: If True, save the returned record (data package, signature, tx details)
+                in a local SQLite database, keyed by data hash.
+            storage_dir: Optional directory holding the local database.
+            payload_format: Encoding of the on-chain payload. "json" (default, human-readable)
+                or "cbor", a compact binary encoding that lowers calldata gas costs.
 
         Returns:
             Dict containing transaction details and data hash
         """
+        if payload_format not in ("json", "cbor"):
+            raise ValueError(
+                f"Unsupported payload_format '{payload_format}'. Choose 'json' or 'cbor'."
+            )
+        if payload_format == "cbor" and not CBOR_AVAILABLE:
+            raise ImportError(
+                "cbor2 is required for CBOR payloads. Install it with: pip install cbor2"
+            )
+
         if self._blockchain_data is {}:
             raise ValueError("No data to write in blockchain.")
 
         if not self.account:
             raise ValueError("Private key required for recording data.")
 
-        # Prepare the data package
+        # Prepare the data package. The data is always re-encoded here, since values stored
+        # with update_data may have been modified in place since the last encoding. The same
+        # bytes give the data hash and (when writing the full data) the on-chain payload.
+        canonical_data, data_hash = self._get_canonical_data(refresh=True)
         if only_write_hash:
-            data_hash = self.compute_hash(self._blockchain_data)
             data_package = data_hash
         else:
-            data_package = self._blockchain_data
-
-        # Store the data package on the blockchain by sending a transaction with the data in the input field
-        serialized_data = json.dumps(data_package)
+            # Decoded from the hashed bytes, so the record keeps matching its hash even if
+            # the traced data changes afterwards
+            data_package = _json_loads(canonical_data)
+
+        # Store the data package on the blockchain by sending a transaction with the data in the input field.
+        # The same bytes are signed below, so the signature matches the on-chain payload.
+        if payload_format == "cbor":
+            serialized_data = _CBOR_PAYLOAD_TAG + cbor2.dumps(
+                data_package, canonical=True
+            )
+        elif only_write_hash:
+            serialized_data = _canonical_json(data_package)
+        else:
+            serialized_data = canonical_data
 
         # Create transaction
+        self._prefetch_tx_metadata()
         tx = {
             "from": self.account.address,
             "to": self.account.address,  # Send to self
             "value": 0,
-            "gasPrice": self.web3.eth.gas_price,
-            "nonce": self.web3.eth.get_transaction_count(self.account.address),
-            "data": self.web3.to_hex(text=serialized_data),
-            "chainId": self.web3.eth.chain_id,  # optional but recommended
+            "gasPrice": self._get_gas_price(),
+            "nonce": self._get_nonce(),
+            "data": "0x" + serialized_data.hex(),
+            "chainId": self._get_chain_id(),  # optional but recommended
         }
         default_gas = 100000  # initial guess of gas needed
         try:
@@ -180,49 +543,185 @@ class BlockchainTracer:
             tx_hash = self.web3.eth.send_raw_transaction(signed_tx.raw_transaction)
 
             # Wait for transaction receipt
-            tx_receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
+            tx_receipt = self.web3.eth.wait_for_transaction_receipt(
+                tx_hash, poll_latency=self.poll_latency
+            )
         except Exception as e:
+            # Resync the nonce from the node on the next write
+            self._nonce = None
             raise RuntimeError(f"Transaction failed: {e}")
+        self._nonce = tx["nonce"] + 1
 
         ## Store the transaction hash in the blockchain data
         # self._blockchain_data['transaction_hash'] = tx_hash.hex()
 
-        # Always compute the signature
-        message = encode_defunct(text=json.dumps(data_package, sort_keys=True))
-        signed_message = self.web3.eth.account.sign_message(
-            message, private_key=self.__private_key
+        # Always compute the signature of the written data
+        from eth_account.messages import encode_defunct
+
+        signed_message = self.account.sign_message(
+            encode_defunct(primitive=serialized_data)
         )
 
         result = {
             "transaction_success": tx_receipt.status == 1,
             "data_package": data_package,
+            "data_hash": data_hash,
+            "hash_algo": self.hash_algo,
             "data_signature": signed_message.signature.hex(),
             "signed_by": self.account.address,
             "transaction_hash": tx_hash.hex(),
             "block_number": tx_receipt.blockNumber,
-            "block_timestamp": self.web3.eth.get_block(
-                tx_receipt.blockNumber
-            ).timestamp,
+            "block_timestamp": self._get_block_timestamp(tx_receipt.blockNumber),
             "tx_dict_to_sign": tx,
             "tx_receipt": tx_receipt,
         }
+        result.update(self._record_metadata())
 
         if save_locally:
-            # Use the provided storage_dir or default to self.storage_dir
-            local_storage_dir = (
-                storage_dir if storage_dir is not None else self.storage_dir
+            payload = orjson.dumps(
+                result, default=_json_default, option=orjson.OPT_NON_STR_KEYS
             )
-            os.makedirs(local_storage_dir, exist_ok=True)
-            local_file_path = os.path.join(local_storage_dir, f"{data_hash}.json")
-            with open(local_file_path, "w") as f:
-                json.dump(result, f)
+            with closing(_connect_records_db(storage_dir)) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO records (hash, tx_hash, block_number, payload) "
+                    "VALUES (?, ?, ?, ?)",
+                    (
+                        data_hash,
+                        _normalize_tx_hash(result["transaction_hash"]),
+                        result["block_number"],
+                        payload,
+                    ),
+                )
 
         return MappingProxyType(result)
 
+    def _record_metadata(self) -> Dict[str, Any]:
+        """
+        Extra fields for the write result (and its local record). They are not part of the
+        hashed data. Empty here; subclasses override it.
+        """
+        return {}
+
+    def _get_canonical_data(self, refresh: bool = False):
+        """
+        Return the canonical JSON bytes of the traced data and their hash.
+        They are cached and only recomputed after the data is modified through update_data
+        (or another method that sets _data_dirty), or when refresh is True. In-place changes
+        to stored values are not detected, so writes always refresh.
+        """
+        if refresh or self._data_dirty or self._canonical_cache is None:
+            canonical_data = _canonical_json(self._blockchain_data)
+            self._canonical_cache = (canonical_data, self.compute_hash(canonical_data))
+            self._data_dirty = False
+        return self._canonical_cache
+
+    def _gas_price_expired(self, now: float) -> bool:
+        """
+        Whether the cached gas price is missing or older than _GAS_PRICE_TTL seconds.
+        """
+        return (
+            self._gas_price_cache is None
+            or now - self._gas_price_cache[0] > _GAS_PRICE_TTL
+        )
+
+    def _prefetch_tx_metadata(self) -> None:
+        """
+        When more than one of the chain id, nonce and gas price must be fetched (e.g. on the
+        first write), get them in a single JSON-RPC batch instead of sequential round-trips.
+        """
+        now = time.monotonic()
+        need_chain_id = self._chain_id is None
+        need_nonce = self._nonce is None
+        need_gas_price = self._gas_price_expired(now)
+        if need_chain_id + need_nonce + need_gas_price < 2:
+            return
+        with self.web3.batch_requests() as batch:
+            if need_chain_id:
+                batch.add(self.web3.eth.chain_id)
+            if need_nonce:
+                batch.add(
+                    self.web3.eth.get_transaction_count(self.account.address, "pending")
+                )
+            if need_gas_price:
+                batch.add(self.web3.eth.gas_price)
+            results = iter(batch.execute())
+        if need_chain_id:
+            self._chain_id = next(results)
+        if need_nonce:
+            self._nonce = next(results)
+        if need_gas_price:
+            self._gas_price_cache = (now, next(results))
+
+    def _get_chain_id(self) -> int:
+        """
+        Return the chain id of the connected network. It cannot change, so it is fetched once.
+        """
+        if self._chain_id is None:
+            self._chain_id = self.web3.eth.chain_id
+        return self._chain_id
+
+    def _get_nonce(self) -> int:
+        """
+        Return the nonce for the next transaction.
+        It is fetched from the node only when unknown, then tracked locally after each write.
+        """
+        if self._nonce is None:
+            self._nonce = self.web3.eth.get_transaction_count(
+                self.account.address, "pending"
+            )
+        return self._nonce
+
+    def _get_gas_price(self) -> int:
+        """
+        Return the network gas price, reusing the last fetched value for _GAS_PRICE_TTL seconds.
+        """
+        now = time.monotonic()
+        if self._gas_price_expired(now):
+            self._gas_price_cache = (now, self.web3.eth.gas_price)
+        return self._gas_price_cache[1]
+
+    def _get_block_timestamp(self, block_number: int) -> int:
+        """
+        Return the timestamp of a block.
+        Finalized blocks are immutable, so their timestamps are kept in a bounded LRU cache.
+        Recent blocks could still be reorganized and are always fetched from the node.
+        """
+        timestamp = self._cache_get(self._block_timestamps, block_number)
+        if timestamp is not None:
+            return timestamp
+
+        timestamp = self.web3.eth.get_block(block_number).timestamp
+        if time.time() - timestamp > _BLOCK_FINALITY_AGE:
+            self._cache_put(
+                self._block_timestamps, block_number, timestamp, _BLOCK_CACHE_SIZE
+            )
+        return timestamp
+
+    def _cache_get(self, cache: OrderedDict, key: Any) -> Any:
+        """
+        Return the value cached under key in one of the tracer's LRUs, or None.
+        """
+        with self._cache_lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def _cache_put(self, cache: OrderedDict, key: Any, value: Any, max_size: int) -> None:
+        """
+        Store a value in one of the tracer's LRUs, evicting the least recently used entry.
+        """
+        with self._cache_lock:
+            cache[key] = value
+            if len(cache) > max_size:
+                cache.popitem(last=False)
+
     def get_transaction_details(self, tx_hash: str) -> Dict[str, Any]:
         """
         Get details of a transaction by its hash, including both blockchain data
         and local file data if available.
+        Transactions in finalized blocks are cached per tracer, so repeated lookups of the
+        same hash skip the RPC calls. Recent ones could still be reorganized and are refetched.
 
         Args:
             tx_hash: Transaction hash
@@ -230,21 +729,47 @@ class BlockchainTracer:
         Returns:
             Dict containing transaction details and associated data
         """
-        # Get blockchain transaction data
-        tx = self.web3.eth.get_transaction(tx_hash)
+        tx_data = self._cache_get(self._tx_details_cache, tx_hash)
+        if tx_data is None:
+            tx_data = self._fetch_transaction_details(tx_hash)
+            block_timestamp = tx_data["transaction"]["block_timestamp"]
+            if time.time() - block_timestamp > _BLOCK_FINALITY_AGE:
+                self._cache_put(self._tx_details_cache, tx_hash, tx_data, _TX_CACHE_SIZE)
+        # Copy the nested dicts so callers cannot modify the cached entry
+        return MappingProxyType(copy.deepcopy(tx_data))
+
+    def _fetch_transaction_details(self, tx_hash: str) -> Dict[str, Any]:
+        """
+        Fetch and decode a transaction from the node. Used through the cache in get_transaction_details.
+        Pending transactions have no receipt yet, so the lookup raises.
+        """
+        # Get blockchain transaction data and receipt in a single JSON-RPC batch
+        with self.web3.batch_requests() as batch:
+            batch.add(self.web3.eth.get_transaction(tx_hash))
+            batch.add(self.web3.eth.get_transaction_receipt(tx_hash))
+            tx, receipt = batch.execute()
 
         # Try to decode the data
+        # tx.input is already raw bytes (HexBytes), so it is parsed without a hex round-trip
         data = {}
-        if tx.input and tx.input != "0x":
+        input_bytes = bytes(tx.input)
+        if input_bytes[:1] == _CBOR_PAYLOAD_TAG:
+            if not CBOR_AVAILABLE:
+                data = {"raw": tx.input}
+            else:
+                try:
+                    data = cbor2.loads(input_bytes[1:])
+                except cbor2.CBORDecodeError:
+                    # Not a CBOR payload after all
+                    data = {"raw": tx.input}
+        elif input_bytes:
             try:
-                hex_data = tx.input.hex()  # [2:]
-                decoded_data = bytes.fromhex(hex_data).decode("utf-8")
-                data = json.loads(decoded_data)
-            except (UnicodeDecodeError, json.JSONDecodeError):
+                data = _json_loads(input_bytes)
+            except (UnicodeDecodeError, orjson.JSONDecodeError):
                 # Try to show as UTF-8 string if possible
                 try:
-                    data = {"raw": bytes.fromhex(hex_data).decode("utf-8")}
-                except Exception:
+                    data = {"raw": input_bytes.decode("utf-8")}
+                except UnicodeDecodeError:
                     data = {"raw": tx.input}
 
         ## Try to get local file data if it exists
@@ -255,12 +780,11 @@ class BlockchainTracer:
         #        with open(local_file_path, "r") as f:
         #            local_data = json.load(f)
 
-        receipt = self.web3.eth.get_transaction_receipt(tx_hash)
         tx_data = {
             "transaction": {
                 "hash": tx_hash,
                 "block_number": tx.blockNumber,
-                "block_timestamp": self.web3.eth.get_block(tx.blockNumber).timestamp,
+                "block_timestamp": self._get_block_timestamp(tx.blockNumber),
                 "from": tx["from"],
                 "to": tx["to"],
                 "value": self.web3.from_wei(tx.value, "ether"),
@@ -271,11 +795,11 @@ class BlockchainTracer:
             "receipt": {
                 "status": receipt.status,
                 "gas_used": receipt.gasUsed,
-                "logs": [dict(log) for log in receipt.logs],
+                "logs": list(map(dict, receipt.logs)),
             },
         }
 
-        return MappingProxyType(tx_data)
+        return tx_data
 
     def get_data(self) -> dict:
         """
@@ -284,6 +808,87 @@ class BlockchainTracer:
         """
         return MappingProxyType(self._blockchain_data)
 
+    def current_hash(self) -> str:
+        """
+        Return the hash of the current traced data, as written by write_to_blockchain.
+        The hash is cached and only recomputed after the data is modified through update_data;
+        values changed in place afterwards are only picked up by the next write.
+        """
+        return self._get_canonical_data()[1]
+
+    def verify_data(self, original_data: Any, blockchain_record: Dict[str, Any]) -> bool:
+        """
+        Check that data matches a traced record.
+
+        Args:
+            original_data: The data that was traced (bytes or any JSON-serializable object).
+            blockchain_record: Result of write_to_blockchain or get_local_record, with its "data_hash".
+
+        Returns:
+            bool: True if the hash of original_data equals the record's data hash.
+        """
+        # Records carry the algorithm they were hashed with; older ones default to the tracer's
+        computed_hash = self.compute_hash(
+            original_data, blockchain_record.get("hash_algo", self.hash_algo)
+        )
+        return self.verify_hash(computed_hash, blockchain_record)
+
+    def verify_hash(self, data_hash: Any, blockchain_record: Dict[str, Any]) -> bool:
+        """
+        Check an already computed hash against a traced record, without rehashing the data.
+
+        Args:
+            data_hash: Hash of the data, as a hexadecimal string or raw digest bytes.
+            blockchain_record: Result of write_to_blockchain or get_local_record, with its "data_hash".
+
+        Returns:
+            bool: True if data_hash equals the record's data hash; False for a missing or
+            non-string hash.
+        """
+        if isinstance(data_hash, (bytes, bytearray)):
+            data_hash = data_hash.hex()
+        record_hash = blockchain_record.get("data_hash")
+        if not isinstance(data_hash, str) or not isinstance(record_hash, str):
+            return False
+        # Constant-time comparison, so the check does not leak how many characters matched.
+        # Compared as bytes: compare_digest rejects non-ASCII str
+        return hmac.compare_digest(data_hash.encode(), record_hash.encode())
+
+    def get_local_record(
+        self,
+        data_hash: Optional[str] = None,
+        storage_dir: str = "./blockchain_storage",
+        tx_hash: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve a record saved with write_to_blockchain(save_locally=True).
+
+        Args:
+            data_hash: Hash of the traced data (the "data_hash" of the write result)
+            storage_dir: Directory holding the local database
+            tx_hash: Transaction hash of the record, to look it up instead of data_hash
+
+        Returns:
+            Dict with the saved record, or None if no matching record exists
+        """
+        if (data_hash is None) == (tx_hash is None):
+            raise ValueError("Provide exactly one of data_hash or tx_hash.")
+        if not os.path.isfile(os.path.join(storage_dir, _RECORDS_DB_NAME)):
+            return None
+        with closing(_connect_records_db(storage_dir)) as conn:
+            if data_hash is not None:
+                row = conn.execute(
+                    "SELECT payload FROM records WHERE hash = ?", (data_hash,)
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT payload FROM records WHERE tx_hash = ?",
+                    (_normalize_tx_hash(tx_hash),),
+                ).fetchone()
+        if row is None:
+            return None
+        return MappingProxyType(_json_loads(row[0]))
+
     def write_file_to_ipfs(self, file_path: str, ipfs_client_url: str = "/ip4/127.0.0.1/tcp/5001") -> Dict[str, Any]:
         """
         Save a file to IPFS and get the associated hash.
@@ -330,7 +935,7 @@ class BlockchainTracer:
                 }
                 
                 # Also compute local hash for verification
-                file_info["local_hash"] = self.compute_hash(file_path)
+                file_info["local_hash"] = self.compute_file_hash(file_path)
                 
                 return MappingProxyType(file_info)
                 
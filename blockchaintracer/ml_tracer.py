@@ -1,15 +1,144 @@
 from typing import Dict, Any, Optional
+import os
 import platform
-import importlib.metadata
 import time
+import functools
+import copy
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from types import MappingProxyType
 
-# import docker
-from datetime import datetime
-from huggingface_hub import DatasetCardData, ModelCardData
-
 from blockchaintracer.blockchain_tracer import BlockchainTracer
 
+# huggingface_hub and docker are imported where they are used: both pull in large
+# dependency trees that are not needed to import this module
+
+
+@functools.lru_cache(maxsize=1)
+def _installed_packages() -> Dict[str, str]:
+    """
+    Map each installed distribution name (as in its metadata) to its version.
+    Reading every package's metadata is slow, so it is done once per process.
+    Call _installed_packages.cache_clear() and _system_info_snapshot.cache_clear() after
+    installing packages at runtime.
+    """
+    import importlib.metadata
+
+    return {
+        dist.metadata["Name"]: dist.version
+        for dist in importlib.metadata.distributions()
+    }
+
+
+@functools.lru_cache(maxsize=8)
+def _package_versions(names: frozenset) -> Dict[str, str]:
+    """
+    Map the metadata name of each installed package in names to its version.
+    Each name is looked up directly (matching is case-, "-", "_" and "." insensitive)
+    instead of scanning every installed distribution.
+    """
+    import importlib.metadata
+
+    versions = {}
+    for name in names:
+        try:
+            dist = importlib.metadata.distribution(name)
+        except importlib.metadata.PackageNotFoundError:
+            continue
+        versions[dist.metadata["Name"]] = dist.version
+    return versions
+
+
+# Default Docker daemon socket on Linux and macOS
+_DOCKER_SOCKET = "/var/run/docker.sock"
+
+
+@functools.lru_cache(maxsize=1)
+def _docker_info() -> Optional[Dict[str, Any]]:
+    """
+    Return the version and info of the local Docker daemon, or None if it is not available.
+    Queried once per process, since probing a daemon that is not running can take seconds.
+    """
+    if os.name != "nt" and not (
+        os.environ.get("DOCKER_HOST") or os.path.exists(_DOCKER_SOCKET)
+    ):
+        return None
+    try:
+        import docker
+    except ImportError:
+        return None
+    try:
+        docker_client = docker.from_env()
+        # Both are independent round-trips to the daemon: run them concurrently
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            version = executor.submit(docker_client.version)
+            info = executor.submit(docker_client.info)
+            return {"version": version.result(), "info": info.result()}
+    except (docker.errors.DockerException, OSError):
+        return None
+
+
+@functools.lru_cache(maxsize=8)
+def _system_info_snapshot(
+    packages: Optional[frozenset] = None, docker: bool = False
+) -> Dict[str, Any]:
+    """
+    Return the system information that does not change within a process (all but the timestamp).
+    Args:
+        packages: Package names to record, or None to record every installed package.
+        docker: Whether to include the local Docker daemon's version and info.
+    """
+    system_info = {
+        "os": platform.platform(),
+        "python_version": platform.python_version(),
+        "packages": (
+            _installed_packages() if packages is None else _package_versions(packages)
+        ),
+    }  # check: es mejor un requirements.txt?
+    docker_info = _docker_info() if docker else None
+    if docker_info is not None:
+        system_info["docker"] = docker_info
+    return system_info
+
+
+@functools.lru_cache(maxsize=None)
+def _card_fields_for(card_class) -> Dict[str, Any]:
+    """
+    Introspect a Hugging Face card class to extract all public fields and their descriptions.
+    Returns a dictionary mapping field names to descriptions.
+    The result only depends on the class, so it is computed once per class and shared
+    by all tracers.
+    """
+    card_instance = card_class()
+    annotations = getattr(card_class, "__annotations__", {})
+
+    # Card fields are plain instance attributes: read them from the instance dict
+    # instead of scanning everything dir() lists (methods, dunders, descriptors)
+    try:
+        attributes = sorted(vars(card_instance).items())
+    except TypeError:
+        # No instance dict (e.g. a class with __slots__)
+        attributes = [
+            (attr_name, getattr(card_instance, attr_name))
+            for attr_name in dir(card_instance)
+        ]
+
+    # Get all attributes that are not private or methods
+    fields = {}
+    for attr_name, attr_value in attributes:
+        if attr_name.startswith("_") or callable(attr_value):
+            continue
+
+        # Get the type hint if available
+        type_hint = annotations.get(attr_name, type(attr_value).__name__)
+
+        # Create a description based on the field name and type
+        description = f"{attr_name.replace('_', ' ').title()} ({type_hint})"
+
+        fields[attr_name] = description
+
+    return fields
+
 
 class MLTracer(BlockchainTracer):
     """
@@ -18,9 +147,31 @@ class MLTracer(BlockchainTracer):
     while adding ML-specific features.
     """
 
+    # Packages recorded by update_system_info(full=False); override to trace a different stack
+    RELEVANT_PACKAGES = frozenset(
+        {
+            "numpy",
+            "scipy",
+            "pandas",
+            "scikit-learn",
+            "torch",
+            "tensorflow",
+            "keras",
+            "jax",
+            "transformers",
+            "datasets",
+            "huggingface-hub",
+            "xgboost",
+            "lightgbm",
+        }
+    )
+
     def __init__(
         self,
         provider_url: Optional[str] = None,
+        hash_algo: str = "sha256",
+        poll_latency: float = 0.1,
+        collect_docker: bool = False,
         # storage_dir: str = "./ml_tracer_storage",
     ):
         """
@@ -28,41 +179,61 @@ class MLTracer(BlockchainTracer):
         Sets up experiment tracking and card field introspection.
         Args:
             provider_url: Blockchain provider URL (optional)
+            hash_algo: Hash algorithm used for data and file hashes ("sha256", "keccak256" or "blake3")
+            poll_latency: Seconds between receipt polls while waiting for a transaction to be mined
+            collect_docker: Include the local Docker daemon's version and info in the system info
             storage_dir: Directory to store files (models, data, etc.)
         Note:
             The private key is loaded exclusively from the BLOCKCHAIN_PRIVATE_KEY environment
             variable via the base class for security reasons.
         """
-        super().__init__(provider_url=provider_url)  # , storage_dir=storage_dir)
-        # self._experiment_history = []
-
-        # cards attributes
-        self._model_card_fields = self._get_card_fields(ModelCardData)
-        self._data_card_fields = self._get_card_fields(
-            DatasetCardData
-        )  # check: que tanto me sirven las clases de cards
+        super().__init__(
+            provider_url=provider_url, hash_algo=hash_algo, poll_latency=poll_latency
+        )  # , storage_dir=storage_dir)
+        self.collect_docker = collect_docker
+        # Transaction of the last successful write, linked from the next write result as
+        # "previous_transaction", and number of experiments successfully written so far
+        self._last_transaction_hash = None
+        self._experiment_count = 0
+
+        # cards attributes, introspected on first use
+        self._model_card_fields = None
+        self._data_card_fields = None  # check: que tanto me sirven las clases de cards
         self._model_card = None
         self._data_card = None
+        # Cards modified inside batch_card_updates(), by card type, stored into the data on exit
+        self._batching_cards = False
+        self._pending_cards = {}
 
     @property
-    def get_model_card(self) -> Optional[ModelCardData]:
+    def get_model_card(self) -> Optional[Dict[str, Any]]:
         """
-        Get the current Hugging Face ModelCardData object for this experiment.
+        Get a read-only view of the current model card fields (ModelCardData.to_dict()),
+        or None if no model card was created yet.
         """
-        return MappingProxyType(self._model_card) # antes usaba '.copy()'
+        if self._model_card is None:
+            return None
+        return MappingProxyType(self._model_card.to_dict())
 
     @property
-    def get_data_card(self) -> Optional[DatasetCardData]:
+    def get_data_card(self) -> Optional[Dict[str, Any]]:
         """
-        Get the current Hugging Face DatasetCardData object for this experiment.
+        Get a read-only view of the current data card fields (DatasetCardData.to_dict()),
+        or None if no data card was created yet.
         """
-        return MappingProxyType(self._data_card)
+        if self._data_card is None:
+            return None
+        return MappingProxyType(self._data_card.to_dict())
 
     @property
     def model_card_fields(self) -> Dict[str, str]:
         """
         Get all available model card fields and their descriptions.
         """
+        if self._model_card_fields is None:
+            from huggingface_hub import ModelCardData
+
+            self._model_card_fields = _card_fields_for(ModelCardData)
         return MappingProxyType(self._model_card_fields)
 
     @property
@@ -70,66 +241,33 @@ class MLTracer(BlockchainTracer):
         """
         Get all available data card fields and their descriptions.
         """
+        if self._data_card_fields is None:
+            from huggingface_hub import DatasetCardData
+
+            self._data_card_fields = _card_fields_for(DatasetCardData)
         return MappingProxyType(self._data_card_fields)
 
-    def update_system_info(self) -> Dict[str, Any]:
+    def update_system_info(self, full: bool = True) -> Dict[str, Any]:
         """
-        Collect system information: OS, Python version, and all installed package versions.
+        Collect system information: OS, Python version, installed package versions and,
+        with collect_docker, the Docker daemon details.
         Used for experiment reproducibility and traceability.
+        Args:
+            full: Record every installed package (default). If False, only the installed
+                packages in RELEVANT_PACKAGES are recorded, which is faster.
         """
-        system_info = {
-            "os": platform.platform(),
-            "python_version": platform.python_version(),
-            "packages": {
-                dist.metadata["Name"]: dist.version
-                for dist in importlib.metadata.distributions()
-            },
-            "timestamp": int(datetime.now().timestamp()),
-        }  # check: es mejor un requirements.txt?
-
-        try:
-            docker_client = docker.from_env()
-            system_info["docker"] = {
-                "version": docker_client.version(),
-                "info": docker_client.info(),
-            }
-        except:
-            # system_info['docker'] = None
-            pass
+        snapshot = _system_info_snapshot(
+            None if full else frozenset(self.RELEVANT_PACKAGES), self.collect_docker
+        )
+        # Deep copy so changes to the traced data cannot leak into the cache
+        system_info = copy.deepcopy(snapshot)
+        system_info["timestamp"] = int(time.time())
 
         self._blockchain_data["system_info"] = system_info
+        self._data_dirty = True
 
         return MappingProxyType(self._blockchain_data)
 
-    def _get_card_fields(self, card_class) -> Dict[str, Any]:
-        """
-        Introspect a Hugging Face card class to extract all public fields and their descriptions.
-        Returns a dictionary mapping field names to descriptions.
-        """
-        card_instance = card_class()
-
-        # Get all attributes that are not private or special methods
-        fields = {}
-        for attr_name in dir(card_instance):
-            # Skip private attributes and methods
-            if not attr_name.startswith("_") and not callable(
-                getattr(card_instance, attr_name)
-            ):
-                # Get the attribute value
-                attr_value = getattr(card_instance, attr_name)
-
-                # Get the type hint if available
-                type_hint = getattr(card_instance.__class__, "__annotations__", {}).get(
-                    attr_name, type(attr_value).__name__
-                )
-
-                # Create a description based on the field name and type
-                description = f"{attr_name.replace('_', ' ').title()} ({type_hint})"
-
-                fields[attr_name] = description
-
-        return fields
-
     def _update_card(self, card_obj, card_type, card_fields, kwargs):
         """
         Shared logic for updating either a model card or data card.
@@ -138,26 +276,67 @@ class MLTracer(BlockchainTracer):
         for key, value in kwargs.items():
             setattr(card_obj, key, value)
 
-        card_to_dict = {card_type: card_obj.to_dict()}
+        if self._batching_cards:
+            self._pending_cards[card_type] = card_obj
+        else:
+            card_to_dict = {card_type: card_obj.to_dict()}
 
-        self.update_data(**card_to_dict)
+            self.update_data(**card_to_dict)
 
         """
+        filled = card_obj.to_dict()
         fields_status = {
-            'filled': {k: v for k, v in card_obj.to_dict().items()},
-            'available': {k: v for k, v in card_fields.items() if k not in card_obj.to_dict()},
+            'filled': filled,
+            'available': card_fields.keys() - filled.keys(),
             'descriptions': card_fields
         }
-        
+
         print( {
-            "fields_filled": list(fields_status['filled'].keys()),
-            "fields_available": list(fields_status['available'].keys()),
-            "experiment_data": self._blockchain_data.copy()
+            "fields_filled": list(filled),
+            "fields_available": sorted(fields_status['available']),
+            "experiment_data": MappingProxyType(self._blockchain_data)
         })
         """
 
         return card_obj
 
+    @contextmanager
+    def batch_card_updates(self):
+        """
+        Group several update_model_card / update_data_card calls.
+        Inside the block only the card objects are updated; each modified card is
+        serialized and stored in the traced data once, when the block exits normally.
+        If the block raises, the cards are restored to their state before the block.
+        write_to_blockchain cannot be called inside the block.
+
+        Example:
+            with tracer.batch_card_updates():
+                tracer.update_model_card(license="mit")
+                tracer.update_model_card(library_name="sklearn")
+        """
+        if self._batching_cards:
+            # Nested block: the outermost one stores the cards
+            yield
+            return
+        saved_cards = copy.deepcopy((self._model_card, self._data_card))
+        self._batching_cards = True
+        try:
+            yield
+        except BaseException:
+            self._model_card, self._data_card = saved_cards
+            raise
+        else:
+            if self._pending_cards:
+                self.update_data(
+                    **{
+                        card_type: card_obj.to_dict()
+                        for card_type, card_obj in self._pending_cards.items()
+                    }
+                )
+        finally:
+            self._batching_cards = False
+            self._pending_cards.clear()
+
     def update_model_card(self, **kwargs) -> dict:
         """
         Update or create the model card for this experiment.
@@ -165,10 +344,12 @@ class MLTracer(BlockchainTracer):
         Returns a summary dict of the update.
         """
         if self._model_card is None:
+            from huggingface_hub import ModelCardData
+
             self._model_card = ModelCardData()
         if kwargs:
             card_obj = self._update_card(
-                self._model_card, "model_card", self._model_card_fields, kwargs
+                self._model_card, "model_card", self.model_card_fields, kwargs
             )
             self._model_card = card_obj
         else:
@@ -183,13 +364,15 @@ class MLTracer(BlockchainTracer):
         Returns a summary dict of the update.
         """
         if self._data_card is None:
+            from huggingface_hub import DatasetCardData
+
             self._data_card = DatasetCardData()
 
         if kwargs:
             card_obj = self._update_card(
                 self._data_card,
                 "data_card",
-                self._data_card_fields,
+                self.data_card_fields,
                 kwargs,
             )
             self._data_card = card_obj
@@ -198,25 +381,38 @@ class MLTracer(BlockchainTracer):
 
         return MappingProxyType(self._blockchain_data)
 
-    def write_to_blockchain(self) -> Dict[str, Any]:
+    def write_to_blockchain(self, **kwargs) -> Dict[str, Any]:
         """
         Write the current experiment data (including model/data cards) to the blockchain.
-        Returns transaction details and data hash.
+        Keyword arguments (e.g. only_write_hash, payload_format) are passed to the base class.
+        Returns transaction details and data hash, plus "experiment_sequence" and
+        "previous_transaction" (None on the first write), which are not part of the hashed data.
         """
 
-        # # Add to experiment history
-        # self._experiment_history.append(self._blockchain_data.copy()) # check. para que?
-        # # If there are previous experiments, link them
-        # if len(self._experiment_history) > 1:
-        #    previous_tx = self._experiment_history[-2].get("transaction_hash")
-        #    if previous_tx:
-        #        self._blockchain_data["previous_transaction"] = previous_tx
+        if self._batching_cards:
+            raise RuntimeError(
+                "write_to_blockchain cannot be called inside batch_card_updates(): "
+                "the card updates are only stored when the block exits."
+            )
 
         # Write to blockchain using base class method
-        result = super().write_to_blockchain()
+        result = super().write_to_blockchain(**kwargs)
+        if result["transaction_success"]:
+            self._last_transaction_hash = result["transaction_hash"]
+            self._experiment_count += 1
 
         return result
 
+    def _record_metadata(self) -> Dict[str, Any]:
+        """
+        Number each write result and link it to the previous successful write of this tracer.
+        Both are kept out of the hashed data, so they do not change the data hash.
+        """
+        metadata = super()._record_metadata()
+        metadata["experiment_sequence"] = self._experiment_count + 1
+        metadata["previous_transaction"] = self._last_transaction_hash
+        return metadata
+
     def get_transaction_details(self, tx_hash: str) -> Dict[str, Any]:
         """
         Retrieve an ML experiment record by its transaction hash.